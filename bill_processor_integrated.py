@@ -8,9 +8,23 @@
 
 import os
 import sys
+import json
+import mmap
 import time
 import logging
+import multiprocessing
 from datetime import datetime
+from functools import partial
+from dataclasses import dataclass
+from typing import Callable, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    from blake3 import blake3 as content_hash
+except ImportError:
+    # 未安装blake3时回退到标准库的BLAKE2
+    from hashlib import blake2b as content_hash
 
 # 添加data目录到路径，以便导入清洗脚本
 sys.path.append(os.path.join(os.path.dirname(__file__), 'data'))
@@ -32,6 +46,53 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 跨进程共享的日志队列：主进程由setup_log_queue创建，工作进程由_init_worker_logging设置
+_log_queue = None
+
+def setup_log_queue():
+    """
+    将根日志器已配置的处理器移交给后台监听线程，各处的日志调用只需写入队列
+    
+    Returns:
+        QueueListener: 已启动的日志监听器，处理结束后需调用stop()
+    """
+    global _log_queue
+    
+    root_logger = logging.getLogger()
+    handlers = list(root_logger.handlers)
+    
+    _log_queue = multiprocessing.Queue(-1)
+    listener = QueueListener(_log_queue, *handlers, respect_handler_level=True)
+    
+    for handler in handlers:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(QueueHandler(_log_queue))
+    
+    listener.start()
+    return listener
+
+def _init_worker_logging(log_queue):
+    """
+    工作进程初始化：日志统一写入主进程的日志队列
+    """
+    global _log_queue
+    
+    _log_queue = log_queue
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(QueueHandler(log_queue))
+
+def create_process_pool(max_workers=None):
+    """
+    创建进程池，若已设置日志队列，工作进程的日志也写入该队列
+    """
+    if _log_queue is None:
+        return ProcessPoolExecutor(max_workers=max_workers)
+    return ProcessPoolExecutor(max_workers=max_workers,
+                               initializer=_init_worker_logging,
+                               initargs=(_log_queue,))
+
 def setup_directories():
     """
     创建必要的目录结构
@@ -63,98 +124,198 @@ def read_config():
     }
     return config
 
-def process_alipay_bills(config):
+@dataclass(frozen=True)
+class PlatformSpec:
+    """
+    单个账单平台的处理规则
+    """
+    name: str                       # 平台名称，用于日志和报告
+    key: str                        # 平台标识，用于区分扫描结果
+    prefixes: Tuple[str, ...]       # 账单文件名前缀
+    suffixes: Tuple[str, ...]       # 支持的文件扩展名
+    cleaner: Callable[[str, str], bool]  # 清洗函数，参数为(文件路径, 输出目录)
+    in_dir: str                     # 输入目录
+    out_dir: str                    # 输出目录
+    
+    def output_path(self, file_name):
+        """
+        账单文件对应的清洗结果文件路径
+        """
+        return os.path.join(self.out_dir, f"{self.key}_{os.path.splitext(file_name)[0]}_processed.csv")
+    
+    def fingerprint_path(self):
+        """
+        记录已处理文件指纹的缓存文件路径（与清洗结果放在同一目录）
+        """
+        return os.path.join(self.out_dir, f".{self.key}_fingerprints.json")
+
+def build_platforms(config):
+    """
+    根据配置生成各平台的处理规则
+    
+    Args:
+        config: 配置信息
+    
+    Returns:
+        List[PlatformSpec]: 各平台的处理规则
+    """
+    return [
+        PlatformSpec('支付宝', 'alipay', ('alipay',), ('.csv', '.xls', '.xlsx'), clean_alipay_bill,
+                     config['alipay_input_dir'], config['alipay_output_dir']),
+        PlatformSpec('微信', 'wechat', ('微信支付账单',), ('.csv',), clean_wechat_bill,
+                     config['wechat_input_dir'], config['wechat_output_dir']),
+        PlatformSpec('京东', 'jingdong', ('京东',), ('.csv', '.xls', '.xlsx'), clean_jingdong_bill,
+                     config['jingdong_input_dir'], config['jingdong_output_dir']),
+    ]
+
+def scan_input_dir(input_dir, platforms):
     """
-    处理支付宝账单
+    扫描输入目录一次，按平台对账单文件进行分类
+    
+    Args:
+        input_dir: 输入目录路径
+        platforms: 需要分类的平台处理规则列表
+    
+    Returns:
+        Dict[str, List[str]]: 各平台的账单文件名列表，键为平台标识
     """
-    logger.info("开始处理支付宝账单...")
+    bill_files = {spec.key: [] for spec in platforms}
+    
     try:
-        # 查找支付宝账单文件
-        alipay_files = [f for f in os.listdir(config['alipay_input_dir']) 
-                       if f.startswith('alipay') and (f.endswith('.csv') or f.endswith('.xls') or f.endswith('.xlsx'))]
-        
-        if not alipay_files:
-            logger.warning("未找到支付宝账单文件")
-            return None
-        
-        # 处理每个支付宝账单文件
-        for file in alipay_files:
-            file_path = os.path.join(config['alipay_input_dir'], file)
-            logger.info(f"处理文件: {file_path}")
-            result = clean_alipay_bill(file_path, config['alipay_output_dir'])
-            if result:
-                logger.info(f"支付宝账单处理成功: {file}")
-            else:
-                logger.error(f"支付宝账单处理失败: {file}")
-                return False
-        
-        logger.info("支付宝账单处理完成")
-        return True
-    except Exception as e:
-        logger.error(f"处理支付宝账单时出错: {str(e)}")
-        return False
+        with os.scandir(input_dir) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                name = entry.name
+                for spec in platforms:
+                    if name.startswith(spec.prefixes) and name.endswith(spec.suffixes):
+                        bill_files[spec.key].append(name)
+                        break
+    except OSError as e:
+        logger.error(f"扫描输入目录时出错: {str(e)}")
+    
+    return bill_files
+
+def fingerprint(file_path):
+    """
+    计算文件内容的哈希值
+    
+    Args:
+        file_path: 文件路径
+    
+    Returns:
+        str: 十六进制哈希值
+    """
+    with open(file_path, 'rb') as f:
+        # 空文件无法创建内存映射
+        if os.fstat(f.fileno()).st_size == 0:
+            return content_hash(b'').hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return content_hash(mapped).hexdigest()
+
+def get_file_state(file_path, cached_state):
+    """
+    获取文件当前的修改时间、大小和内容哈希
+    
+    修改时间和大小都与缓存一致时直接沿用缓存的哈希值，不再读取文件内容
+    """
+    stat = os.stat(file_path)
+    if cached_state and cached_state.get('mtime') == stat.st_mtime and cached_state.get('size') == stat.st_size:
+        digest = cached_state.get('hash')
+    else:
+        digest = fingerprint(file_path)
+    return {'mtime': stat.st_mtime, 'size': stat.st_size, 'hash': digest}
 
-def process_wechat_bills(config):
+def load_fingerprints(cache_path):
     """
-    处理微信账单
+    读取已处理文件的指纹缓存，缓存不存在或损坏时返回空字典
     """
-    logger.info("开始处理微信账单...")
     try:
-        # 查找微信账单文件
-        wechat_files = [f for f in os.listdir(config['wechat_input_dir']) 
-                       if f.startswith('微信支付账单') and f.endswith('.csv')]
-        
-        if not wechat_files:
-            logger.warning("未找到微信账单文件")
-            return None
-        
-        # 处理每个微信账单文件
-        for file in wechat_files:
-            file_path = os.path.join(config['wechat_input_dir'], file)
-            logger.info(f"处理文件: {file_path}")
-            result = clean_wechat_bill(file_path, config['wechat_output_dir'])
-            if result:
-                logger.info(f"微信账单处理成功: {file}")
-            else:
-                logger.error(f"微信账单处理失败: {file}")
-                return False
-        
-        logger.info("微信账单处理完成")
-        return True
-    except Exception as e:
-        logger.error(f"处理微信账单时出错: {str(e)}")
-        return False
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-def process_jingdong_bills(config):
+def save_fingerprints(cache_path, fingerprints):
     """
-    处理京东账单
+    保存已处理文件的指纹缓存
     """
-    logger.info("开始处理京东账单...")
     try:
-        # 查找京东账单文件
-        jingdong_files = [f for f in os.listdir(config['jingdong_input_dir']) 
-                         if (f.startswith('京东') or f.startswith('京东商城')) and \
-                            (f.endswith('.csv') or f.endswith('.xls') or f.endswith('.xlsx'))]
-        
-        if not jingdong_files:
-            logger.warning("未找到京东账单文件")
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(fingerprints, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        logger.warning(f"保存文件指纹缓存时出错: {str(e)}")
+
+def process_platform(spec, bill_files, max_workers=None):
+    """
+    处理单个平台的账单
+    
+    Args:
+        spec: 平台处理规则
+        bill_files: 输入目录中该平台的账单文件名列表
+        max_workers: 并行清洗文件的最大进程数，默认为CPU核数
+    
+    Returns:
+        Optional[bool]: 全部成功返回True，有失败返回False，没有文件返回None
+    """
+    logger.info(f"开始处理{spec.name}账单...")
+    try:
+        if not bill_files:
+            logger.warning(f"未找到{spec.name}账单文件")
             return None
         
-        # 处理每个京东账单文件
-        for file in jingdong_files:
-            file_path = os.path.join(config['jingdong_input_dir'], file)
+        # 跳过内容未变化且已有清洗结果的文件
+        cache_path = spec.fingerprint_path()
+        cached_fingerprints = load_fingerprints(cache_path)
+        fingerprints = {}
+        pending_files = []
+        file_states = {}
+        for file in bill_files:
+            file_path = os.path.join(spec.in_dir, file)
+            cached_state = cached_fingerprints.get(file)
+            state = get_file_state(file_path, cached_state)
+            if cached_state and state['hash'] == cached_state.get('hash') and os.path.exists(spec.output_path(file)):
+                logger.info(f"文件未变化，跳过处理: {file_path}")
+                fingerprints[file] = state
+            else:
+                pending_files.append(file)
+                file_states[file] = state
+        
+        # 并行处理每个账单文件
+        file_paths = [os.path.join(spec.in_dir, file) for file in pending_files]
+        for file_path in file_paths:
             logger.info(f"处理文件: {file_path}")
-            result = clean_jingdong_bill(file_path, config['jingdong_output_dir'])
+        
+        all_success = True
+        cleaner = partial(spec.cleaner, output_dir=spec.out_dir)
+        if len(file_paths) == 1:
+            # 只有一个文件时直接在当前进程处理，无需再创建进程池
+            results = [cleaner(file_paths[0])]
+        elif file_paths:
+            # 进程数不超过文件数和分配给该平台的进程数
+            pool_size = min(len(file_paths), max_workers or os.cpu_count() or 1)
+            with create_process_pool(pool_size) as executor:
+                results = list(executor.map(cleaner, file_paths))
+        else:
+            results = []
+        
+        for file, result in zip(pending_files, results):
             if result:
-                logger.info(f"京东账单处理成功: {file}")
+                logger.info(f"{spec.name}账单处理成功: {file}")
+                fingerprints[file] = file_states[file]
             else:
-                logger.error(f"京东账单处理失败: {file}")
-                return False
+                logger.error(f"{spec.name}账单处理失败: {file}")
+                all_success = False
+        
+        save_fingerprints(cache_path, fingerprints)
+        
+        if not all_success:
+            return False
         
-        logger.info("京东账单处理完成")
+        logger.info(f"{spec.name}账单处理完成")
         return True
     except Exception as e:
-        logger.error(f"处理京东账单时出错: {str(e)}")
+        logger.error(f"处理{spec.name}账单时出错: {str(e)}")
         return False
 
 def generate_processing_report(config, results):
@@ -190,47 +351,67 @@ def main():
     """
     主函数
     """
-    start_time = time.time()
-    logger.info("===== 开始集成账单处理 =====")
-    
-    # 设置目录结构
-    setup_directories()
-    
-    # 读取配置
-    config = read_config()
-    
-    # 处理各平台账单
-    results = {
-        '支付宝': None,
-        '微信': None,
-        '京东': None
-    }
-    
-    results['支付宝'] = process_alipay_bills(config)
-    results['微信'] = process_wechat_bills(config)
-    results['京东'] = process_jingdong_bills(config)
-    
-    # 检查是否有成功处理的账单文件
-    has_successful_process = any(result for result in results.values() if result)
-    
-    # 如果有成功处理的账单，执行合并
-    if has_successful_process:
-        merge_result = merge_bills(config['merged_output_dir'])
-        results['账单合并'] = merge_result
-    else:
-        logger.warning("没有成功处理的账单，跳过合并步骤")
-        results['账单合并'] = None
-    
-    # 生成处理报告
-    generate_processing_report(config, results)
+    # 日志写入改为异步队列，由后台线程统一落盘
+    listener = setup_log_queue()
     
-    end_time = time.time()
-    logger.info(f"===== 账单处理完成，耗时: {end_time - start_time:.2f} 秒 =====")
-    
-    # 检查是否有处理失败的情况
-    if any(result is False for result in results.values()):
-        return 1
-    return 0
+    try:
+        start_time = time.time()
+        logger.info("===== 开始集成账单处理 =====")
+        
+        # 设置目录结构
+        setup_directories()
+        
+        # 读取配置
+        config = read_config()
+        
+        # 处理各平台账单
+        platforms = build_platforms(config)
+        results = {spec.name: None for spec in platforms}
+        
+        # 每个输入目录只扫描一次，同一目录下的平台共用扫描结果
+        scanned_files = {}
+        for input_dir in {spec.in_dir for spec in platforms}:
+            scanned_files[input_dir] = scan_input_dir(
+                input_dir, [spec for spec in platforms if spec.in_dir == input_dir])
+        
+        # 各平台账单互不依赖，使用进程池并行处理
+        # 各平台在自己的进程中还会并行清洗多个文件，CPU核数在平台之间平分，避免进程总数成倍超过核数
+        workers_per_platform = max(1, (os.cpu_count() or 1) // len(platforms))
+        with create_process_pool(max_workers=len(platforms)) as executor:
+            futures = {executor.submit(process_platform, spec, scanned_files[spec.in_dir][spec.key],
+                                       workers_per_platform): spec.name
+                       for spec in platforms}
+            for future in as_completed(futures):
+                platform = futures[future]
+                try:
+                    results[platform] = future.result()
+                except Exception as e:
+                    logger.error(f"处理{platform}账单时出错: {str(e)}")
+                    results[platform] = False
+        
+        # 检查是否有成功处理的账单文件
+        has_successful_process = any(result for result in results.values() if result)
+        
+        # 如果有成功处理的账单，执行合并
+        if has_successful_process:
+            merge_result = merge_bills(config['merged_output_dir'])
+            results['账单合并'] = merge_result
+        else:
+            logger.warning("没有成功处理的账单，跳过合并步骤")
+            results['账单合并'] = None
+        
+        # 生成处理报告
+        generate_processing_report(config, results)
+        
+        end_time = time.time()
+        logger.info(f"===== 账单处理完成，耗时: {end_time - start_time:.2f} 秒 =====")
+        
+        # 检查是否有处理失败的情况
+        if any(result is False for result in results.values()):
+            return 1
+        return 0
+    finally:
+        listener.stop()
 
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file
@@ -10,8 +10,13 @@ import os
 import sys
 import json
 import logging
+import orjson
 import requests
+import pandas as pd
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # 配置日志
 logging.basicConfig(
@@ -44,6 +49,36 @@ except Exception as e:
     logger.error(f"导入配置时出错: {str(e)}")
     sys.exit(1)
 
+# 并发上传的线程数，与连接池大小保持一致
+UPLOAD_WORKERS = 4
+
+# 复用的HTTP会话，所有批次共享同一个keep-alive连接池
+_session = None
+
+def get_session():
+    """
+    获取上传使用的HTTP会话（首次调用时创建）
+    """
+    global _session
+    
+    if _session is None:
+        _session = requests.Session()
+        # 只在被限流（429）时重试POST：此时服务端未写入数据，可以安全重发，并按Retry-After等待；
+        # 读取响应失败不重试，避免服务端已写入后重复提交；重试用尽时返回最后一次响应，由调用方处理错误码
+        retry = Retry(
+            total=3,
+            read=0,
+            backoff_factor=0.5,
+            status_forcelist=[429],
+            allowed_methods=frozenset(['POST']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=UPLOAD_WORKERS, max_retries=retry)
+        _session.mount(config['base_url'], adapter)
+    
+    return _session
+
 def create_dirs():
     """
     创建必要的目录
@@ -89,7 +124,6 @@ def read_csv_file(file_path):
     读取CSV文件内容
     """
     try:
-        import csv
         data = []
         
         # 尝试不同的编码
@@ -97,10 +131,11 @@ def read_csv_file(file_path):
         
         for encoding in encodings:
             try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        data.append(row)
+                # 全部按字符串读取，空单元格保留为空字符串
+                df = pd.read_csv(file_path, encoding=encoding, dtype=str, na_filter=False, engine='c')
+                # 统一去除首尾空白，得到可直接上传的字段值
+                df = df.apply(lambda column: column.str.strip())
+                data = df.to_dict(orient='records')
                 logger.info(f"成功读取文件 {file_path}，使用编码: {encoding}")
                 break
             except UnicodeDecodeError:
@@ -114,6 +149,13 @@ def read_csv_file(file_path):
         logger.error(f"读取CSV文件时出错: {str(e)}")
         return []
 
+def _post_batch(session, url, headers, payload):
+    """
+    上传单个批次的数据，返回飞书接口的响应内容
+    """
+    response = session.post(url, headers=headers, data=orjson.dumps(payload))
+    return response.json()
+
 def upload_to_feishu(bill_data, filename):
     """
     将账单数据上传到飞书多维表格
@@ -133,36 +175,44 @@ def upload_to_feishu(bill_data, filename):
     total_records = len(bill_data)
     uploaded_records = 0
     
+    session = get_session()
+    
     try:
+        # 预先构建所有批次的请求数据
+        payloads = []
         for i in range(0, total_records, batch_size):
             batch = bill_data[i:i+batch_size]
             
-            # 转换数据格式
-            records = []
-            for row in batch:
-                fields = {}
-                for key, value in row.items():
-                    # 处理特殊字符和空值
-                    if isinstance(value, str):
-                        value = value.strip()
-                    fields[key] = value if value else ""
-                
-                records.append({'fields': fields})
+            # 字段值已在读取时清理，直接组装记录
+            records = [{'fields': row} for row in batch]
             
-            payload = {
+            payloads.append({
                 'records': records
-            }
-            
-            response = requests.post(url, headers=headers, json=payload)
-            result = response.json()
+            })
+        
+        # 多个批次并发上传，重叠网络往返等待时间
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+            futures = {executor.submit(_post_batch, session, url, headers, payload): len(payload['records'])
+                       for payload in payloads}
             
-            if result.get('code') == 0:
-                uploaded_records += len(batch)
-                logger.info(f"成功上传 {len(batch)} 条记录，累计: {uploaded_records}/{total_records}")
-            else:
-                logger.error(f"上传失败: {result.get('msg', '未知错误')}")
-                logger.error(f"错误详情: {json.dumps(result, ensure_ascii=False)}")
-                return False
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"上传数据时出错: {str(e)}")
+                    # 请求本身失败时同样取消尚未开始的批次，避免重新上传时产生重复记录
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    return False
+                
+                if result.get('code') == 0:
+                    uploaded_records += futures[future]
+                    logger.info(f"成功上传 {futures[future]} 条记录，累计: {uploaded_records}/{total_records}")
+                else:
+                    logger.error(f"上传失败: {result.get('msg', '未知错误')}")
+                    logger.error(f"错误详情: {json.dumps(result, ensure_ascii=False)}")
+                    # 取消尚未开始的批次
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    return False
     except Exception as e:
         logger.error(f"上传数据时出错: {str(e)}")
         return False
@@ -10,8 +10,12 @@ import os
 import sys
 import csv
 import logging
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from functools import lru_cache
+
+from csv_utils import read_file_head, write_csv_with_bom
 
 # 配置日志
 logging.basicConfig(
@@ -24,6 +28,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# CSV各列统一按字符串读取（保留全部列，交易订单号、备注等供上传和合并使用），避免pandas逐列推断类型
+# 支付宝原始表头常带尾随空格，无法按列名指定dtype，因此对全部列生效
+ALIPAY_DTYPE = 'string'
+
+# 清理金额时需要删除的字符：货币符号、千分位逗号和空白
+AMOUNT_STRIP_TABLE = str.maketrans('', '', '¥, \t\n\r\f\v\xa0\u3000')
+
+# 收/支列中表示收入、支出的关键字
+INCOME_KEYWORDS = ('收入', '转入', '收款')
+EXPENSE_KEYWORDS = ('支出', '转出', '付款')
+
 def setup_log_directory():
     """
     设置日志目录
@@ -35,23 +50,37 @@ def setup_log_directory():
 
 def detect_file_encoding(file_path):
     """
-    检测文件编码
+    检测文件编码（按文件路径和修改时间缓存结果）
+    """
+    return probe_csv_file(file_path)[0]
+
+def probe_csv_file(file_path):
+    """
+    读取一次文件头，同时检测文件编码和表头所在行（按文件路径和修改时间缓存结果）
+    
+    Args:
+        file_path: 输入文件路径
+    
+    Returns:
+        Tuple[str, Optional[int]]: 文件编码，以及表头所在的行号（文件头中未找到时为None）
+    """
+    return _probe_csv_file(file_path, os.path.getmtime(file_path))
+
+@lru_cache(maxsize=None)
+def _probe_csv_file(file_path, mtime):
+    """
+    读取文件头并解析编码和表头行号，结果由probe_csv_file按修改时间缓存
     """
-    encodings = ['utf-8', 'gbk', 'utf-16', 'latin1']
+    encoding, text = read_file_head(file_path)
     
-    for encoding in encodings:
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                # 读取前几行来测试编码
-                for _ in range(5):
-                    f.readline()
-            logger.info(f"检测到文件编码: {encoding}")
-            return encoding
-        except UnicodeDecodeError:
-            continue
+    # 找到表头所在行
+    header_index = None
+    for i, line in enumerate(text.split('\n')):
+        if '交易时间' in line and '交易类型' in line and '交易对方' in line:
+            header_index = i
+            break
     
-    logger.warning("无法确定文件编码，默认使用utf-8")
-    return 'utf-8'
+    return encoding, header_index
 
 def clean_alipay_bill(file_path, output_dir):
     """
@@ -73,40 +102,35 @@ def clean_alipay_bill(file_path, output_dir):
             os.makedirs(output_dir)
             logger.info(f"创建输出目录: {output_dir}")
         
-        # 检测文件编码
-        encoding = detect_file_encoding(file_path)
-        
         # 读取文件扩展名
         file_ext = os.path.splitext(file_path)[1].lower()
         
         # 根据文件类型选择读取方法
         if file_ext in ['.csv']:
             # 对于CSV文件，可能需要跳过前几行的账单说明信息
-            with open(file_path, 'r', encoding=encoding) as f:
-                lines = f.readlines()
-            
-            # 找到表头所在行
-            header_index = None
-            for i, line in enumerate(lines):
-                if '交易时间' in line and '交易类型' in line and '交易对方' in line:
-                    header_index = i
-                    break
+            # 只读取一次文件头，同时确定编码和表头所在行
+            encoding, header_index = probe_csv_file(file_path)
             
             if header_index is not None:
-                # 提取有效数据
-                valid_lines = lines[header_index:]
-                
-                # 使用pandas读取数据
-                from io import StringIO
-                df = pd.read_csv(StringIO(''.join(valid_lines)), encoding=encoding)
+                # 跳过说明行，直接由pandas读取文件
+                df = pd.read_csv(file_path, encoding=encoding, skiprows=header_index, engine='c',
+                                 dtype=ALIPAY_DTYPE)
                 logger.info(f"成功读取CSV文件，共 {len(df)} 条记录")
             else:
                 # 尝试直接读取
-                df = pd.read_csv(file_path, encoding=encoding)
+                df = pd.read_csv(file_path, encoding=encoding, engine='c',
+                                 dtype=ALIPAY_DTYPE)
                 logger.info(f"直接读取CSV文件，共 {len(df)} 条记录")
         
-        elif file_ext in ['.xls', '.xlsx']:
-            # 对于Excel文件
+        elif file_ext == '.xlsx':
+            # 对于xlsx文件，显式指定openpyxl引擎（pandas以read_only/data_only模式加载工作簿），
+            # 只解析第一个工作表，与CSV、xls一样保留全部列
+            with pd.ExcelFile(file_path, engine='openpyxl') as xl:
+                df = xl.parse(xl.sheet_names[0])
+            logger.info(f"成功读取Excel文件，共 {len(df)} 条记录")
+        
+        elif file_ext == '.xls':
+            # 对于旧版xls文件
             df = pd.read_excel(file_path)
             logger.info(f"成功读取Excel文件，共 {len(df)} 条记录")
         
@@ -115,7 +139,7 @@ def clean_alipay_bill(file_path, output_dir):
             return False
         
         # 清理列名（去除空格和换行符）
-        df.columns = df.columns.str.strip().str.replace('\n', '')
+        df = df.rename(columns=lambda col: str(col).strip().replace('\n', ''))
         
         # 检查必要的列是否存在
         required_columns = ['交易时间', '交易对方', '金额']
@@ -129,11 +153,19 @@ def clean_alipay_bill(file_path, output_dir):
                 if similar_cols:
                     logger.info(f"可能的替代列 '{missing_col}': {', '.join(similar_cols)}")
         
+        # 各列的转换结果先收集起来，最后通过一次assign写回，减少对数据框的多次修改
+        converted_columns = {}
+        
         # 处理日期列
         if '交易时间' in df.columns:
             try:
-                # 尝试转换日期格式
-                df['交易时间'] = pd.to_datetime(df['交易时间'], errors='coerce')
+                # 支付宝交易时间通常为"YYYY-MM-DD HH:MM:SS"，优先按固定格式解析
+                trade_time = pd.to_datetime(df['交易时间'], format='%Y-%m-%d %H:%M:%S', errors='coerce', cache=True)
+                # 不符合固定格式的值再按自动推断的方式解析
+                unmatched = trade_time.isna() & df['交易时间'].notna()
+                if unmatched.any():
+                    trade_time[unmatched] = pd.to_datetime(df.loc[unmatched, '交易时间'], errors='coerce', cache=True)
+                converted_columns['交易时间'] = trade_time
                 logger.info("成功转换交易时间列")
             except Exception as e:
                 logger.error(f"转换交易时间列时出错: {str(e)}")
@@ -141,10 +173,9 @@ def clean_alipay_bill(file_path, output_dir):
         # 处理金额列
         if '金额' in df.columns:
             try:
-                # 移除货币符号和逗号
-                df['金额'] = df['金额'].astype(str).str.replace('[¥,\s]', '', regex=True)
-                # 转换为数字
-                df['金额'] = pd.to_numeric(df['金额'], errors='coerce')
+                # 移除货币符号、逗号和空白后转换为数字（按字符表删除，无需正则）
+                converted_columns['金额'] = pd.to_numeric(
+                    df['金额'].astype('string').str.translate(AMOUNT_STRIP_TABLE), errors='coerce')
                 logger.info("成功转换金额列")
             except Exception as e:
                 logger.error(f"转换金额列时出错: {str(e)}")
@@ -152,28 +183,39 @@ def clean_alipay_bill(file_path, output_dir):
         # 处理收支方向
         if '收/支' not in df.columns and ('收支类型' in df.columns or '类型' in df.columns):
             if '收支类型' in df.columns:
-                df['收/支'] = df['收支类型']
+                converted_columns['收/支'] = df['收支类型']
             elif '类型' in df.columns:
-                df['收/支'] = df['类型']
+                converted_columns['收/支'] = df['类型']
             logger.info("添加收/支列")
         
-        # 清理空行
-        original_len = len(df)
-        df.dropna(how='all', inplace=True)
-        cleaned_rows = original_len - len(df)
+        df = df.assign(**converted_columns)
+        
+        # 一次性清理空行和重复行：分别计算掩码后合并，只筛选一次数据
+        # 重复行按整行的64位哈希判断，保留首次出现的行
+        all_null = df.isna().all(axis=1).to_numpy()
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        _, first_index = np.unique(row_hashes, return_index=True)
+        first_occurrence = np.zeros(len(df), dtype=bool)
+        first_occurrence[first_index] = True
+        keep = ~all_null & first_occurrence
+        
+        cleaned_rows = int(all_null.sum())
+        deduplicated_rows = len(df) - cleaned_rows - int(keep.sum())
+        df = df.loc[keep].reset_index(drop=True)
         if cleaned_rows > 0:
             logger.info(f"删除空行: {cleaned_rows} 行")
-        
-        # 清理重复行
-        original_len = len(df)
-        df.drop_duplicates(inplace=True)
-        deduplicated_rows = original_len - len(df)
         if deduplicated_rows > 0:
             logger.info(f"删除重复行: {deduplicated_rows} 行")
         
         # 按交易时间排序
         if '交易时间' in df.columns:
-            df.sort_values(by='交易时间', inplace=True)
+            if pd.api.types.is_datetime64_any_dtype(df['交易时间']):
+                # 以int64时间戳作为排序键，空值排在最后（与sort_values一致）
+                time_key = df['交易时间'].to_numpy(dtype='datetime64[ns]').view('i8')
+                time_key = np.where(df['交易时间'].isna().to_numpy(), np.iinfo(np.int64).max, time_key)
+                df = df.iloc[np.argsort(time_key, kind='stable')]
+            else:
+                df = df.sort_values(by='交易时间', kind='stable')
             logger.info("按交易时间排序")
         
         # 生成输出文件名
@@ -182,7 +224,7 @@ def clean_alipay_bill(file_path, output_dir):
         output_path = os.path.join(output_dir, file_name)
         
         # 保存处理后的数据
-        df.to_csv(output_path, index=False, encoding='utf-8-sig')
+        write_csv_with_bom(df, output_path)
         logger.info(f"处理完成，保存到: {output_path}")
         
         # 生成处理报告
@@ -199,7 +241,9 @@ def generate_report(input_file, output_file, df, cleaned_rows, deduplicated_rows
     生成处理报告
     """
     report_dir = os.path.dirname(output_file)
-    report_path = os.path.join(report_dir, 'alipay_bill_cleaning_report.md')
+    # 每个输入文件单独生成报告，避免并行处理多个文件时互相覆盖
+    input_name = os.path.splitext(os.path.basename(input_file))[0]
+    report_path = os.path.join(report_dir, f"alipay_{input_name}_cleaning_report.md")
     
     try:
         with open(report_path, 'w', encoding='utf-8') as f:
@@ -223,13 +267,7 @@ def generate_report(input_file, output_file, df, cleaned_rows, deduplicated_rows
             # 转换为Markdown表格格式
             if len(df) > 0:
                 sample_df = df.head().fillna('')
-                # 写入表头
-                f.write('| ' + ' | '.join(sample_df.columns) + ' |\n')
-                f.write('| ' + ' | '.join(['---'] * len(sample_df.columns)) + ' |\n')
-                # 写入数据行
-                for _, row in sample_df.iterrows():
-                    row_str = '| ' + ' | '.join([str(val) for val in row]) + ' |\n'
-                    f.write(row_str)
+                f.write(sample_df.to_markdown(index=False) + '\n')
             else:
                 f.write("无数据\n")
             
@@ -238,8 +276,18 @@ def generate_report(input_file, output_file, df, cleaned_rows, deduplicated_rows
             if '收/支' in df.columns and '金额' in df.columns:
                 # 确保金额列是数字类型
                 if pd.api.types.is_numeric_dtype(df['金额']):
-                    income = df[df['收/支'].str.contains('收入|转入|收款', na=False)]['金额'].sum()
-                    expense = df[df['收/支'].str.contains('支出|转出|付款', na=False)]['金额'].sum()
+                    # 收/支取值很少，先编码为分类，只对类别判断收支方向，再按类别编码映射到每一行
+                    direction = df['收/支'].astype('category')
+                    category_signs = [
+                        1 if any(k in str(c) for k in INCOME_KEYWORDS)
+                        else -1 if any(k in str(c) for k in EXPENSE_KEYWORDS)
+                        else 0
+                        for c in direction.cat.categories
+                    ]
+                    # 末尾追加0，对应空值的类别编码-1
+                    sign = np.array(category_signs + [0], dtype='int8')[direction.cat.codes.to_numpy()]
+                    income = df.loc[sign == 1, '金额'].sum()
+                    expense = df.loc[sign == -1, '金额'].sum()
                     f.write(f"- 总收入: {income:.2f}\n")
                     f.write(f"- 总支出: {expense:.2f}\n")
                     f.write(f"- 净收支: {(income - expense):.2f}\n")
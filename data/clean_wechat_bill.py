@@ -8,50 +8,240 @@
 
 import os
 import sys
-import re
 import logging
+import tempfile
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from pathlib import Path
+
+from csv_utils import read_file_head, write_csv_with_bom, write_table_csv_with_bom
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(os.path.dirname(__file__), 'log', 'wechat_cleaning.log')),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+# 脚本所在目录及日志目录
+_HERE = Path(__file__).resolve().parent
+LOG_DIR = _HERE / 'log'
+
+# 安装了pyarrow时使用其多线程CSV解析器，否则回退到pandas的C解析器
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.dataset as pads
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pacsv = None
+
+# 文本列使用的字符串类型，安装了pyarrow时使用Arrow存储，读取后无需再复制为Python字符串
+STRING_DTYPE = 'string[pyarrow]' if pa is not None else 'string'
+
+# 超过该大小的文件分块清洗（需要pyarrow），每次读取的数据块大小
+LARGE_FILE_THRESHOLD = 50 * 1024 * 1024
+CHUNK_BLOCK_SIZE = 16 * 1024 * 1024
+
+# pyarrow无法解析文件时，pandas的C解析器分块读取的行数
+CHUNK_ROWS = 200_000
+
+# 微信账单交易时间的固定格式
+WECHAT_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# 微信账单各列的数据类型，读取时直接按此解析，避免逐列推断
+# 交易类型、收/支取值很少，使用分类类型；单号位数较长，按字符串读取以免丢失精度
+# 交易时间不在此列，由pyarrow按WECHAT_TIME_FORMAT直接解析为时间戳
+WECHAT_SCHEMA = {
+    '交易类型': 'category',
+    '交易对方': STRING_DTYPE,
+    '商品': STRING_DTYPE,
+    '收/支': 'category',
+    '金额(元)': STRING_DTYPE,
+    '支付方式': STRING_DTYPE,
+    '当前状态': STRING_DTYPE,
+    '交易单号': STRING_DTYPE,
+    '商户单号': STRING_DTYPE,
+    '备注': STRING_DTYPE,
+}
+
+def read_wechat_csv(file_path, encoding, skip_lines=0):
+    """
+    按WECHAT_SCHEMA读取微信账单CSV文件
+    
+    pandas的pyarrow引擎会先推断类型再转换dtype，超长的单号会先被解析成浮点数而丢失精度，
+    因此直接调用pyarrow.csv并通过column_types指定列类型，交易时间同时按固定格式解析
+    
+    Args:
+        file_path: CSV文件路径
+        encoding: 文件编码
+        skip_lines: 表头之前需要跳过的行数
+    
+    Returns:
+        DataFrame: 读取到的账单数据
+    """
+    if pacsv is not None:
+        try:
+            table = pacsv.read_csv(
+                file_path,
+                read_options=pacsv.ReadOptions(encoding=encoding, skip_rows=skip_lines),
+                convert_options=_arrow_convert_options(),
+            )
+            return _table_to_frame(table)
+        except pa.ArrowInvalid as e:
+            # pyarrow不接受列数不足的行，pandas的C解析器会用空值补齐，改用C解析器重新读取
+            logger.warning("pyarrow解析失败，改用pandas的C解析器读取: %s", e)
+    
+    return pd.read_csv(file_path, encoding=encoding, skiprows=skip_lines,
+                       engine='c', dtype=WECHAT_SCHEMA)
+
+def _arrow_convert_options():
+    """
+    pyarrow读取微信账单时的列类型转换选项
+    """
+    return pacsv.ConvertOptions(
+        column_types={column: pa.string() for column in WECHAT_SCHEMA},
+        strings_can_be_null=True,
+        timestamp_parsers=[WECHAT_TIME_FORMAT],
+    )
+
+def _table_to_frame(table):
+    """
+    将pyarrow读取的表转换为DataFrame，并按WECHAT_SCHEMA设置列类型
+    """
+    df = table.to_pandas()
+    return df.astype({column: dtype for column, dtype in WECHAT_SCHEMA.items() if column in df.columns})
+
+def transform_columns(df, log_steps=True):
+    """
+    清理列名，并转换交易时间、金额、单号、收/支等列
+    
+    Args:
+        df: 读取到的账单数据（整个文件或其中一块）
+        log_steps: 是否以INFO级别记录各转换步骤，分块处理时只在第一块记录
+    
+    Returns:
+        DataFrame: 转换后的账单数据
+    """
+    log_step = logger.info if log_steps else logger.debug
+    
+    # 清理列名（去除空格和换行符）
+    df.columns = df.columns.str.strip().str.replace('\n', '')
+    
+    # 检查必要的列是否存在
+    required_columns = ['交易时间', '交易类型', '金额(元)']
+    missing_columns = [col for col in required_columns if col not in df.columns]
+    
+    if missing_columns and log_steps:
+        logger.warning("缺少部分必要列: %s", ', '.join(missing_columns))
+        # 尝试找到相似的列名
+        for missing_col in missing_columns:
+            similar_cols = [col for col in df.columns if missing_col in col or col in missing_col]
+            if similar_cols:
+                logger.info("可能的替代列 '%s': %s", missing_col, ', '.join(similar_cols))
+    
+    # 处理日期列
+    if '交易时间' in df.columns:
+        try:
+            # 微信账单的日期格式通常为"YYYY-MM-DD HH:MM:SS"，优先按固定格式解析
+            # （pyarrow读取时已解析成功的时间列无需再次转换）
+            trade_time = pd.to_datetime(df['交易时间'], format=WECHAT_TIME_FORMAT, errors='coerce', cache=True)
+            # 不符合固定格式的值再按自动推断的方式解析
+            unmatched = trade_time.isna() & df['交易时间'].notna()
+            if unmatched.any():
+                trade_time[unmatched] = pd.to_datetime(df.loc[unmatched, '交易时间'], errors='coerce', cache=True)
+            df['交易时间'] = trade_time
+            log_step("成功转换交易时间列")
+        except Exception as e:
+            logger.error("转换交易时间列时出错: %s", e)
+    
+    # 处理金额列
+    if '金额(元)' in df.columns:
+        try:
+            # 移除货币符号、逗号和首尾空白，使用字面量替换避免逐个元素执行正则
+            # 按WECHAT_SCHEMA读取时已是字符串类型，只有其他类型才需要转换
+            amount = df['金额(元)']
+            if not isinstance(amount.dtype, pd.StringDtype):
+                amount = amount.astype(STRING_DTYPE)
+            for symbol in ('¥', ','):
+                amount = amount.str.replace(symbol, '', regex=False)
+            # 转换为数字
+            df['金额(元)'] = pd.to_numeric(amount.str.strip(), errors='coerce')
+            # 为了与其他账单保持一致，重命名为"金额"
+            df = df.rename(columns={'金额(元)': '金额'})
+            log_step("成功转换金额列")
+        except Exception as e:
+            logger.error("转换金额列时出错: %s", e)
+    
+    # 处理单号列：微信导出的单号末尾带有制表符，按字符串读取后需要去除
+    for id_col in ('交易单号', '商户单号'):
+        if id_col in df.columns:
+            df[id_col] = df[id_col].str.strip()
+    
+    # 处理收支方向
+    if '收/支' in df.columns:
+        # 收/支只有"收入"、"支出"、"/"等少数取值，使用分类类型存储
+        df['收/支'] = df['收/支'].astype('category')
+        log_step("标准化收/支列")
+    
+    # 处理商品名称列（有些版本称为"商品"）
+    if '商品' in df.columns and '商品名称' not in df.columns:
+        df = df.rename(columns={'商品': '商品名称'})
+        log_step("将'商品'列重命名为'商品名称'")
+    
+    return df
+
 def setup_log_directory():
     """
     设置日志目录
     """
-    log_dir = os.path.join(os.path.dirname(__file__), 'log')
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-        logger.info(f"创建日志目录: {log_dir}")
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+
+def setup_logging():
+    """
+    配置日志输出（仅在独立运行时调用，作为模块导入时由调用方配置日志）
+    """
+    setup_log_directory()
+    # 日志格式中不包含线程和进程信息，无需为每条记录采集
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_DIR / 'wechat_cleaning.log'),
+            logging.StreamHandler()
+        ]
+    )
 
 def detect_file_encoding(file_path):
     """
     检测文件编码
     """
-    encodings = ['utf-8', 'gbk', 'utf-16', 'latin1']
+    return probe_csv_file(file_path)[0]
+
+def probe_csv_file(file_path):
+    """
+    读取一次文件开头的二进制数据，同时检测文件编码和表头所在行
     
-    for encoding in encodings:
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                # 读取前几行来测试编码
-                for _ in range(5):
-                    f.readline()
-            logger.info(f"检测到文件编码: {encoding}")
-            return encoding
-        except UnicodeDecodeError:
-            continue
-    
-    logger.warning("无法确定文件编码，默认使用utf-8")
-    return 'utf-8'
+    Args:
+        file_path: CSV文件路径
+    
+    Returns:
+        tuple: (文件编码, 表头所在行号)，未找到表头时行号为None
+    """
+    encoding, text = read_file_head(file_path)
+    
+    # 查找表头所在行（通常包含"交易时间"、"交易类型"等关键字）
+    # 直接在文本中定位关键字，表头行号即其所在行之前的换行符数量，无需拆分出每一行
+    start = text.find('交易时间')
+    while start >= 0:
+        line_start = text.rfind('\n', 0, start) + 1
+        line_end = text.find('\n', start)
+        if line_end < 0:
+            line_end = len(text)
+        if '交易类型' in text[line_start:line_end]:
+            return encoding, text.count('\n', 0, line_start)
+        start = text.find('交易时间', line_end)
+    return encoding, None
 
 def clean_wechat_bill(file_path, output_dir):
     """
@@ -65,205 +255,302 @@ def clean_wechat_bill(file_path, output_dir):
         bool: 处理成功返回True，失败返回False
     """
     setup_log_directory()
-    logger.info(f"开始处理微信账单文件: {file_path}")
+    logger.info("开始处理微信账单文件: %s", file_path)
     
     try:
         # 确保输出目录存在
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-            logger.info(f"创建输出目录: {output_dir}")
-        
-        # 检测文件编码
-        encoding = detect_file_encoding(file_path)
+        os.makedirs(output_dir, exist_ok=True)
         
         # 读取文件扩展名
-        file_ext = os.path.splitext(file_path)[1].lower()
+        source_path = Path(file_path)
+        file_ext = source_path.suffix.lower()
         
         if file_ext != '.csv':
-            logger.error(f"微信账单通常为CSV格式，当前文件格式: {file_ext}")
+            logger.error("微信账单通常为CSV格式，当前文件格式: %s", file_ext)
             return False
         
         # 微信账单CSV文件通常有一些说明行需要跳过
-        with open(file_path, 'r', encoding=encoding) as f:
-            lines = f.readlines()
-        
-        # 找到表头所在行（通常包含"交易时间"、"交易类型"等关键字）
-        header_index = None
-        for i, line in enumerate(lines):
-            if '交易时间' in line and '交易类型' in line:
-                header_index = i
-                break
+        # 从文件开头的一块数据中同时检测编码和表头所在行（通常包含"交易时间"、"交易类型"等关键字）
+        encoding, header_index = probe_csv_file(file_path)
         
         if header_index is not None:
-            # 提取有效数据
-            valid_lines = lines[header_index:]
-            logger.info(f"跳过前 {header_index} 行说明文本")
-            
-            # 使用pandas读取数据
-            from io import StringIO
-            df = pd.read_csv(StringIO(''.join(valid_lines)), encoding=encoding)
-            logger.info(f"成功读取微信账单文件，共 {len(df)} 条记录")
+            logger.info("跳过前 %d 行说明文本", header_index)
         else:
-            # 尝试直接读取
-            df = pd.read_csv(file_path, encoding=encoding)
-            logger.info(f"直接读取微信账单文件，共 {len(df)} 条记录")
-        
-        # 清理列名（去除空格和换行符）
-        df.columns = df.columns.str.strip().str.replace('\n', '')
-        
-        # 检查必要的列是否存在
-        required_columns = ['交易时间', '交易类型', '金额(元)']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+            # 未找到表头时从第一行开始直接读取
+            header_index = 0
+            logger.warning("未找到表头行，尝试直接读取文件")
         
-        if missing_columns:
-            logger.warning(f"缺少部分必要列: {', '.join(missing_columns)}")
-            # 尝试找到相似的列名
-            for missing_col in missing_columns:
-                similar_cols = [col for col in df.columns if missing_col in col or col in missing_col]
-                if similar_cols:
-                    logger.info(f"可能的替代列 '{missing_col}': {', '.join(similar_cols)}")
-        
-        # 处理日期列
-        if '交易时间' in df.columns:
-            try:
-                # 微信账单的日期格式通常为"YYYY-MM-DD HH:MM:SS"
-                df['交易时间'] = pd.to_datetime(df['交易时间'], errors='coerce')
-                logger.info("成功转换交易时间列")
-            except Exception as e:
-                logger.error(f"转换交易时间列时出错: {str(e)}")
-        
-        # 处理金额列
-        if '金额(元)' in df.columns:
-            try:
-                # 移除货币符号和逗号
-                df['金额(元)'] = df['金额(元)'].astype(str).str.replace('[¥,\s]', '', regex=True)
-                # 转换为数字
-                df['金额(元)'] = pd.to_numeric(df['金额(元)'], errors='coerce')
-                # 为了与其他账单保持一致，重命名为"金额"
-                df = df.rename(columns={'金额(元)': '金额'})
-                logger.info("成功转换金额列")
-            except Exception as e:
-                logger.error(f"转换金额列时出错: {str(e)}")
+        # 生成输出文件名
+        file_name = f"wechat_{source_path.stem}_processed.csv"
+        output_path = os.path.join(output_dir, file_name)
         
-        # 处理收支方向
-        if '收/支' in df.columns:
-            # 统一收支表示
-            df['收/支'] = df['收/支'].str.replace('支出', '支出').str.replace('收入', '收入')
-            logger.info("标准化收/支列")
+        # 大文件分块清洗，避免整个文件同时以DataFrame形式驻留内存
+        if pa is not None and os.path.getsize(file_path) > LARGE_FILE_THRESHOLD:
+            logger.info("文件较大，分块处理")
+            summary, cleaned_rows, deduplicated_rows = clean_large_wechat_bill(
+                file_path, encoding, header_index, output_path)
+            logger.info("处理完成，保存到: %s", output_path)
+            generate_report(file_path, output_path, summary, cleaned_rows, deduplicated_rows)
+            return True
         
-        # 处理商品名称列（有些版本称为"商品"）
-        if '商品' in df.columns and '商品名称' not in df.columns:
-            df = df.rename(columns={'商品': '商品名称'})
-            logger.info("将'商品'列重命名为'商品名称'")
+        # 跳过说明行后按指定的列类型直接读取文件，并转换各列
+        df = transform_columns(read_wechat_csv(file_path, encoding, header_index))
+        logger.info("成功读取微信账单文件，共 %d 条记录", len(df))
         
-        # 清理空行
-        original_len = len(df)
-        df.dropna(how='all', inplace=True)
-        cleaned_rows = original_len - len(df)
+        # 清理空行和重复行：先用掩码一次筛掉空行，再去重，避免多次原地修改整个DataFrame
+        not_empty = df.notna().any(axis=1)
+        cleaned_rows = int((~not_empty).sum())
+        df = df.loc[not_empty].drop_duplicates(ignore_index=True)
+        deduplicated_rows = int(not_empty.sum()) - len(df)
         if cleaned_rows > 0:
-            logger.info(f"删除空行: {cleaned_rows} 行")
-        
-        # 清理重复行
-        original_len = len(df)
-        df.drop_duplicates(inplace=True)
-        deduplicated_rows = original_len - len(df)
+            logger.info("删除空行: %d 行", cleaned_rows)
         if deduplicated_rows > 0:
-            logger.info(f"删除重复行: {deduplicated_rows} 行")
+            logger.info("删除重复行: %d 行", deduplicated_rows)
         
         # 按交易时间排序
         if '交易时间' in df.columns:
-            df.sort_values(by='交易时间', inplace=True)
+            df = df.sort_values(by='交易时间', kind='stable', ignore_index=True)
             logger.info("按交易时间排序")
         
         # 添加平台标识列
         df['平台'] = '微信'
         logger.info("添加平台标识列")
         
-        # 生成输出文件名
-        base_name = os.path.basename(file_path)
-        file_name = f"wechat_{os.path.splitext(base_name)[0]}_processed.csv"
-        output_path = os.path.join(output_dir, file_name)
-        
         # 保存处理后的数据
-        df.to_csv(output_path, index=False, encoding='utf-8-sig')
-        logger.info(f"处理完成，保存到: {output_path}")
+        write_csv_with_bom(df, output_path)
+        logger.info("处理完成，保存到: %s", output_path)
         
         # 生成处理报告
-        generate_report(file_path, output_path, df, cleaned_rows, deduplicated_rows)
+        generate_report(file_path, output_path, summarize_bill(df), cleaned_rows, deduplicated_rows)
         
         return True
         
     except Exception as e:
-        logger.error(f"处理微信账单时出错: {str(e)}", exc_info=True)
+        logger.error("处理微信账单时出错: %s", e, exc_info=True)
         return False
 
-def generate_report(input_file, output_file, df, cleaned_rows, deduplicated_rows):
+def clean_large_wechat_bill(file_path, encoding, skip_lines, output_path):
+    """
+    分块清洗较大的微信账单（需要安装pyarrow）
+    
+    逐块读取并转换数据，块内去重后用64位行哈希跨块去重，清洗后的数据块暂存为Parquet文件，
+    最后读回为Arrow表按交易时间排序一次并写出，全程不构建整个文件的DataFrame
+    
+    Args:
+        file_path: 输入文件路径
+        encoding: 文件编码
+        skip_lines: 表头之前需要跳过的行数
+        output_path: 输出文件路径
+    
+    Returns:
+        tuple: (数据摘要, 删除的空行数, 删除的重复行数)
+    """
+    try:
+        return _clean_chunks(_iter_arrow_chunks(file_path, encoding, skip_lines), output_path)
+    except pa.ArrowInvalid as e:
+        # pyarrow不接受列数不足的行，改用pandas的C解析器从头分块读取，缺少的列用空值补齐
+        logger.warning("pyarrow解析失败，改用pandas的C解析器分块读取: %s", e)
+        return _clean_chunks(_iter_c_chunks(file_path, encoding, skip_lines), output_path)
+
+def _iter_arrow_chunks(file_path, encoding, skip_lines):
+    """
+    用pyarrow按CHUNK_BLOCK_SIZE逐块读取微信账单
+    """
+    reader = pacsv.open_csv(
+        file_path,
+        read_options=pacsv.ReadOptions(encoding=encoding, skip_rows=skip_lines, block_size=CHUNK_BLOCK_SIZE),
+        convert_options=_arrow_convert_options(),
+    )
+    for batch in reader:
+        yield _table_to_frame(pa.Table.from_batches([batch]))
+
+def _iter_c_chunks(file_path, encoding, skip_lines):
+    """
+    用pandas的C解析器按CHUNK_ROWS逐块读取微信账单
+    """
+    with pd.read_csv(file_path, encoding=encoding, skiprows=skip_lines, engine='c',
+                     dtype=WECHAT_SCHEMA, chunksize=CHUNK_ROWS) as reader:
+        yield from reader
+
+def _clean_chunks(chunks, output_path):
+    """
+    逐块清洗数据并写出，返回(数据摘要, 删除的空行数, 删除的重复行数)
+    """
+    cleaned_rows = 0
+    deduplicated_rows = 0
+    summary = None
+    # 已写出的行的哈希值（每行8字节），用于跨块去重
+    seen_hashes = np.empty(0, dtype=np.uint64)
+    
+    with tempfile.TemporaryDirectory() as spill_dir:
+        spill_path = os.path.join(spill_dir, 'cleaned.parquet')
+        writer = None
+        try:
+            for chunk_index, chunk in enumerate(chunks):
+                chunk = transform_columns(chunk, log_steps=chunk_index == 0)
+                
+                # 清理空行
+                not_empty = chunk.notna().any(axis=1)
+                cleaned_rows += int((~not_empty).sum())
+                chunk = chunk.loc[not_empty]
+                
+                # 保留块内首次出现且在之前的块中未出现过的行
+                hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+                keep = np.zeros(len(hashes), dtype=bool)
+                keep[np.unique(hashes, return_index=True)[1]] = True
+                keep &= ~np.isin(hashes, seen_hashes)
+                seen_hashes = np.union1d(seen_hashes, hashes)
+                deduplicated_rows += int((~keep).sum())
+                chunk = chunk.loc[keep].reset_index(drop=True)
+                
+                # 添加平台标识列，分类列按字符串写出，保证各块的表结构一致
+                chunk['平台'] = '微信'
+                category_columns = chunk.select_dtypes(include='category').columns
+                chunk = chunk.astype({col: STRING_DTYPE for col in category_columns})
+                
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(spill_path, table.schema)
+                else:
+                    table = table.cast(writer.schema, safe=False)
+                writer.write_table(table)
+                
+                summary = merge_summaries(summary, summarize_bill(chunk))
+        finally:
+            if writer is not None:
+                writer.close()
+        
+        if writer is None:
+            raise ValueError("文件中没有可读取的数据")
+        
+        if cleaned_rows > 0:
+            logger.info("删除空行: %d 行", cleaned_rows)
+        if deduplicated_rows > 0:
+            logger.info("删除重复行: %d 行", deduplicated_rows)
+        
+        # 读回清洗后的数据，按交易时间稳定排序（空值排在最后）
+        table = pads.dataset(spill_path, format='parquet').to_table()
+        if '交易时间' in table.column_names:
+            table = table.sort_by('交易时间')
+            logger.info("按交易时间排序")
+        
+        write_table_csv_with_bom(table, output_path)
+    
+    summary['sample'] = table.slice(0, 5).to_pandas()
+    return summary, cleaned_rows, deduplicated_rows
+
+def summarize_bill(df):
+    """
+    汇总报告所需的数据摘要：记录数、列名、前5行、收支合计和交易类型分布
+    """
+    totals = None
+    if '收/支' in df.columns and '金额' in df.columns and pd.api.types.is_numeric_dtype(df['金额']):
+        # 按收/支分类一次性汇总金额
+        totals = df.groupby('收/支', observed=True)['金额'].sum()
+    
+    type_counts = df['交易类型'].value_counts() if '交易类型' in df.columns else None
+    
+    return {
+        'rows': len(df),
+        'columns': list(df.columns),
+        'sample': df.head(),
+        'totals': totals,
+        'type_counts': type_counts,
+    }
+
+def merge_summaries(summary, chunk_summary):
+    """
+    将一个数据块的摘要合并到已有摘要中
+    """
+    if summary is None:
+        return chunk_summary
+    
+    def add_counts(left, right):
+        if left is None or right is None:
+            return left if right is None else right
+        # 各块的分类取值不同，按取值（而不是分类编码）对齐后相加
+        left = left.set_axis(left.index.astype(object))
+        right = right.set_axis(right.index.astype(object))
+        return left.add(right, fill_value=0)
+    
+    summary['rows'] += chunk_summary['rows']
+    summary['totals'] = add_counts(summary['totals'], chunk_summary['totals'])
+    type_counts = add_counts(summary['type_counts'], chunk_summary['type_counts'])
+    if type_counts is not None:
+        type_counts = type_counts.astype('int64').sort_values(ascending=False, kind='stable')
+    summary['type_counts'] = type_counts
+    return summary
+
+def generate_report(input_file, output_file, summary, cleaned_rows, deduplicated_rows):
     """
     生成处理报告
     """
     report_dir = os.path.dirname(output_file)
-    report_path = os.path.join(report_dir, 'wechat_bill_cleaning_report.md')
+    # 每个输入文件单独生成报告，避免并行处理多个文件时互相覆盖
+    input_name = os.path.splitext(os.path.basename(input_file))[0]
+    report_path = os.path.join(report_dir, f"wechat_{input_name}_cleaning_report.md")
     
     try:
+        rows = summary['rows']
+        
+        # 先拼接完整的报告内容，最后一次性写入文件
+        parts = []
+        parts.append("# 微信账单清洗报告\n\n")
+        parts.append(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        
+        parts.append("## 处理信息\n\n")
+        parts.append(f"- 输入文件: {os.path.basename(input_file)}\n")
+        parts.append(f"- 输出文件: {os.path.basename(output_file)}\n")
+        parts.append(f"- 原始记录数: {rows + cleaned_rows + deduplicated_rows}\n")
+        parts.append(f"- 清理后记录数: {rows}\n")
+        parts.append(f"- 删除空行数: {cleaned_rows}\n")
+        parts.append(f"- 删除重复行数: {deduplicated_rows}\n\n")
+        
+        parts.append("## 数据概览\n\n")
+        parts.append("### 包含的列\n\n")
+        parts.extend(f"- {col}\n" for col in summary['columns'])
+        
+        parts.append("\n### 前5行数据\n\n")
+        # 转换为Markdown表格格式
+        if rows > 0:
+            # 分类列不能直接用空字符串填充空值，先转换为object类型
+            sample_df = summary['sample'].astype(object).fillna('')
+            # 关闭数字解析，避免较长的单号被当作浮点数显示
+            parts.append(sample_df.to_markdown(index=False, disable_numparse=True) + '\n')
+        else:
+            parts.append("无数据\n")
+        
+        parts.append("\n### 统计信息\n\n")
+        # 计算收支统计
+        totals = summary['totals']
+        if totals is not None:
+            income = totals.get('收入', 0.0)
+            expense = totals.get('支出', 0.0)
+            parts.append(f"- 总收入: {income:.2f}\n")
+            parts.append(f"- 总支出: {expense:.2f}\n")
+            parts.append(f"- 净收支: {(income - expense):.2f}\n")
+        
+        # 交易类型统计
+        type_counts = summary['type_counts']
+        if type_counts is not None:
+            parts.append("\n### 交易类型分布\n\n")
+            parts.extend(f"- {transaction_type}: {count}\n" for transaction_type, count in type_counts.items())
+        
         with open(report_path, 'w', encoding='utf-8') as f:
-            f.write("# 微信账单清洗报告\n\n")
-            f.write(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            f.write("## 处理信息\n\n")
-            f.write(f"- 输入文件: {os.path.basename(input_file)}\n")
-            f.write(f"- 输出文件: {os.path.basename(output_file)}\n")
-            f.write(f"- 原始记录数: {len(df) + cleaned_rows + deduplicated_rows}\n")
-            f.write(f"- 清理后记录数: {len(df)}\n")
-            f.write(f"- 删除空行数: {cleaned_rows}\n")
-            f.write(f"- 删除重复行数: {deduplicated_rows}\n\n")
-            
-            f.write("## 数据概览\n\n")
-            f.write("### 包含的列\n\n")
-            for col in df.columns:
-                f.write(f"- {col}\n")
-            
-            f.write("\n### 前5行数据\n\n")
-            # 转换为Markdown表格格式
-            if len(df) > 0:
-                sample_df = df.head().fillna('')
-                # 写入表头
-                f.write('| ' + ' | '.join(sample_df.columns) + ' |\n')
-                f.write('| ' + ' | '.join(['---'] * len(sample_df.columns)) + ' |\n')
-                # 写入数据行
-                for _, row in sample_df.iterrows():
-                    row_str = '| ' + ' | '.join([str(val) for val in row]) + ' |\n'
-                    f.write(row_str)
-            else:
-                f.write("无数据\n")
-            
-            f.write("\n### 统计信息\n\n")
-            # 计算收支统计
-            if '收/支' in df.columns and '金额' in df.columns:
-                # 确保金额列是数字类型
-                if pd.api.types.is_numeric_dtype(df['金额']):
-                    income = df[df['收/支'].str.contains('收入', na=False)]['金额'].sum()
-                    expense = df[df['收/支'].str.contains('支出', na=False)]['金额'].sum()
-                    f.write(f"- 总收入: {income:.2f}\n")
-                    f.write(f"- 总支出: {expense:.2f}\n")
-                    f.write(f"- 净收支: {(income - expense):.2f}\n")
-            
-            # 交易类型统计
-            if '交易类型' in df.columns:
-                f.write("\n### 交易类型分布\n\n")
-                type_counts = df['交易类型'].value_counts()
-                for transaction_type, count in type_counts.items():
-                    f.write(f"- {transaction_type}: {count}\n")
+            f.write(''.join(parts))
         
-        logger.info(f"生成处理报告: {report_path}")
+        logger.info("生成处理报告: %s", report_path)
         return True
     except Exception as e:
-        logger.error(f"生成处理报告时出错: {str(e)}")
+        logger.error("生成处理报告时出错: %s", e)
         return False
 
 def main():
     """
     主函数，用于独立运行时测试
     """
+    setup_logging()
+    
     if len(sys.argv) < 3:
         print("用法: python clean_wechat_bill.py <输入文件路径> <输出目录路径>")
         return 1
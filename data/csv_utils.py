@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+账单CSV读写工具
+
+该模块提供各账单清洗脚本共用的编码检测和CSV写出功能。
+"""
+
+import codecs
+import logging
+
+# 安装了pyarrow时使用其C++实现的CSV写入器，否则回退到pandas的to_csv
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pacsv
+except ImportError:
+    pa = None
+
+# 严格的utf-8和gbk都无法解码时才使用charset_normalizer按字节分布推断编码
+try:
+    from charset_normalizer import from_bytes
+except ImportError:
+    from_bytes = None
+
+logger = logging.getLogger(__name__)
+
+# 检测编码时读取的文件头字节数
+HEAD_PROBE_SIZE = 64 * 1024
+
+# 时间列写出的格式，与pandas写出的"YYYY-MM-DD HH:MM:SS"保持一致
+OUTPUT_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def read_file_head(file_path):
+    """
+    读取文件开头的一块数据并检测编码
+    
+    Args:
+        file_path: 文件路径
+    
+    Returns:
+        tuple: (文件编码, 解码后的文件头文本)
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(HEAD_PROBE_SIZE)
+    
+    encoding = detect_encoding(head)
+    return encoding, decode_head(head, encoding)
+
+def decode_head(head, encoding):
+    """
+    解码文件头，忽略末尾被截断的不完整字符
+    """
+    return codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+
+def detect_encoding(head):
+    """
+    检测文件头的编码
+    
+    账单几乎都是utf-8或gbk编码，先按这两种编码严格解码（开销很小），
+    都失败时才用charset_normalizer推断，最后逐个尝试其余常见编码
+    
+    Args:
+        head: 文件开头的二进制数据
+    
+    Returns:
+        str: 文件编码，无法确定时为utf-8
+    """
+    # 带BOM的utf-16文件也能按gbk解码出乱码，先根据BOM判断
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        logger.info("检测到文件编码: utf-16")
+        return 'utf-16'
+    
+    for encoding in ('utf-8', 'gbk'):
+        try:
+            decode_head(head, encoding)
+        except UnicodeDecodeError:
+            continue
+        logger.info("检测到文件编码: %s", encoding)
+        return encoding
+    
+    if from_bytes is not None:
+        # 截断到最后一个完整行，避免末尾被截断的多字节字符导致检测失败
+        best_match = from_bytes(head[:head.rfind(b'\n') + 1] or head).best()
+        if best_match is not None:
+            logger.info("检测到文件编码: %s", best_match.encoding)
+            return best_match.encoding
+    
+    for encoding in ('utf-16', 'latin1'):
+        try:
+            decode_head(head, encoding)
+        except UnicodeDecodeError:
+            continue
+        logger.info("检测到文件编码: %s", encoding)
+        return encoding
+    
+    logger.warning("无法确定文件编码，默认使用utf-8")
+    return 'utf-8'
+
+def write_csv_with_bom(df, output_path):
+    """
+    将数据写出为带UTF-8 BOM的CSV文件（便于Excel直接打开）
+    
+    安装了pyarrow时使用其C++实现的CSV写入器，否则回退到pandas的to_csv
+    
+    Args:
+        df: 要写出的数据
+        output_path: 输出文件路径
+    """
+    if pa is None:
+        df.to_csv(output_path, index=False, encoding='utf-8-sig')
+        return
+    
+    # Excel读取的object列可能混有字符串和数字，Arrow无法推断统一类型，先统一转换为字符串
+    object_columns = df.select_dtypes(include='object').columns
+    if len(object_columns) > 0:
+        df = df.astype({col: 'string' for col in object_columns})
+    
+    write_table_csv_with_bom(pa.Table.from_pandas(df, preserve_index=False), output_path)
+
+def write_table_csv_with_bom(table, output_path):
+    """
+    将pyarrow表写出为带UTF-8 BOM的CSV文件（需要安装pyarrow）
+    
+    Args:
+        table: 要写出的pyarrow表
+        output_path: 输出文件路径
+    """
+    # 时间列按秒精度格式化
+    for i, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type):
+            seconds = pc.cast(table.column(i), pa.timestamp('s'), safe=False)
+            table = table.set_column(i, field.name, pc.strftime(seconds, format=OUTPUT_TIME_FORMAT))
+    
+    with open(output_path, 'wb') as f:
+        f.write(codecs.BOM_UTF8)
+        pacsv.write_csv(table, f, pacsv.WriteOptions(include_header=True))
@@ -8,16 +8,37 @@
 
 import os
 import logging
-import configparser
+import importlib.machinery
+import importlib.util
+from functools import lru_cache
 from typing import Dict, Optional, Any
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=16)
+def _load_config_file(config_file: str, mtime: float) -> Optional[Dict[str, Any]]:
+    """
+    以模块方式加载Python配置文件并读取FEISHU_CONFIG
+    
+    结果按(路径, 修改时间)缓存，配置文件未修改时重复创建配置实例不会再次读取文件
+    
+    Args:
+        config_file: 配置文件路径
+        mtime: 配置文件的修改时间，仅用作缓存键
+        
+    Returns:
+        Optional[Dict[str, Any]]: FEISHU_CONFIG配置字典，未定义时返回None
+    """
+    # 显式指定源文件加载器，使没有.py扩展名的配置文件（如config.conf）也能加载
+    module_name = '_feishu_user_config'
+    loader = importlib.machinery.SourceFileLoader(module_name, config_file)
+    spec = importlib.util.spec_from_file_location(module_name, config_file, loader=loader)
+    if spec is None:
+        raise ImportError(f"无法加载配置文件: {config_file}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return getattr(module, 'FEISHU_CONFIG', None)
+
 class FeishuConfig:
     """
     飞书配置类，负责读取和验证飞书API所需的配置信息
@@ -32,7 +53,6 @@ class FeishuConfig:
         """
         self.config_file = config_file or self._get_default_config_path()
         self.config_data = {}
-        self.config_parser = configparser.ConfigParser()
         self._load_config()
     
     def _get_default_config_path(self) -> str:
@@ -48,10 +68,10 @@ class FeishuConfig:
             os.path.join(os.path.dirname(os.path.dirname(os.getcwd())), 'config.py')
         ]
         
-        for path in possible_paths:
-            if os.path.exists(path):
-                logger.info(f"找到默认配置文件: {path}")
-                return path
+        path = next((p for p in possible_paths if os.path.exists(p)), None)
+        if path is not None:
+            logger.info("找到默认配置文件: %s", path)
+            return path
         
         logger.warning("未找到默认配置文件，将使用空配置")
         return os.path.join(os.getcwd(), 'config.py')
@@ -62,23 +82,21 @@ class FeishuConfig:
         """
         try:
             if not os.path.exists(self.config_file):
-                logger.error(f"配置文件不存在: {self.config_file}")
+                logger.error("配置文件不存在: %s", self.config_file)
                 return
             
-            # 使用execfile方式加载Python配置文件
-            config_dict = {}
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                exec(f.read(), config_dict)
+            # 加载Python配置文件（按修改时间缓存）
+            feishu_config = _load_config_file(self.config_file, os.path.getmtime(self.config_file))
             
-            # 提取配置信息
-            if 'FEISHU_CONFIG' in config_dict:
-                self.config_data = config_dict['FEISHU_CONFIG']
+            # 提取配置信息，复制一份以免update_config修改缓存中的字典
+            if feishu_config is not None:
+                self.config_data = dict(feishu_config)
                 logger.info("成功加载飞书配置")
             else:
                 logger.warning("配置文件中未找到FEISHU_CONFIG")
                 
         except Exception as e:
-            logger.error(f"加载配置文件时出错: {str(e)}")
+            logger.error("加载配置文件时出错: %s", e)
     
     def get_app_info(self) -> Dict[str, str]:
         """
@@ -95,7 +113,7 @@ class FeishuConfig:
         # 验证应用信息是否完整
         if not all(app_info.values()):
             missing_fields = [k for k, v in app_info.items() if not v]
-            logger.warning(f"飞书应用信息不完整，缺少字段: {', '.join(missing_fields)}")
+            logger.warning("飞书应用信息不完整，缺少字段: %s", ', '.join(missing_fields))
         
         return app_info
     
@@ -114,7 +132,7 @@ class FeishuConfig:
         # 验证多维表格信息是否完整
         if not all(bitable_info.values()):
             missing_fields = [k for k, v in bitable_info.items() if not v]
-            logger.warning(f"多维表格信息不完整，缺少字段: {', '.join(missing_fields)}")
+            logger.warning("多维表格信息不完整，缺少字段: %s", ', '.join(missing_fields))
         
         return bitable_info
     
@@ -147,7 +165,7 @@ class FeishuConfig:
         # 验证代理配置格式
         required_proxy_keys = ['http', 'https']
         if not all(key in proxy_config for key in required_proxy_keys):
-            logger.warning(f"代理配置格式不正确，应包含: {', '.join(required_proxy_keys)}")
+            logger.warning("代理配置格式不正确，应包含: %s", ', '.join(required_proxy_keys))
         
         return proxy_config
     
@@ -184,10 +202,10 @@ class FeishuConfig:
         """
         try:
             self.config_data[key] = value
-            logger.info(f"更新配置: {key} = {value}")
+            logger.info("更新配置: %s = %s", key, value)
             return True
         except Exception as e:
-            logger.error(f"更新配置时出错: {str(e)}")
+            logger.error("更新配置时出错: %s", e)
             return False
 
 def get_feishu_config(config_file: str = None) -> FeishuConfig:
@@ -219,6 +237,11 @@ def main():
     """
     主函数，用于测试配置读取
     """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    
     config = get_feishu_config()
     
     print("\n应用信息:")
@@ -10,7 +10,6 @@ import os
 import sys
 import logging
 import datetime
-import traceback
 from typing import Optional, Dict, Any
 from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
 
@@ -92,12 +91,10 @@ class LogUtils:
         """
         确保日志目录存在
         """
-        if not os.path.exists(self.log_dir):
-            try:
-                os.makedirs(self.log_dir, exist_ok=True)
-                print(f"创建日志目录: {self.log_dir}")
-            except Exception as e:
-                print(f"无法创建日志目录: {e}")
+        try:
+            os.makedirs(self.log_dir, exist_ok=True)
+        except Exception as e:
+            print(f"无法创建日志目录: {e}")
     
     def _setup_logger(self) -> logging.Logger:
         """
@@ -178,16 +175,9 @@ class LogUtils:
             e: 异常对象
             extra: 额外信息
         """
-        error_info = {
-            'error_type': type(e).__name__,
-            'error_message': str(e),
-            'traceback': traceback.format_exc()
-        }
-        
-        if extra:
-            error_info.update(extra)
-        
-        self.logger.error(f"捕获异常: {error_info}")
+        # 异常堆栈和额外信息都交由日志框架在输出时格式化
+        # 额外信息写入消息参数而不是extra，避免与LogRecord的内置属性（如filename）冲突
+        self.logger.error("捕获异常: %s %s", e, extra or {}, exc_info=e)
     
     def log_with_context(self, level: int, message: str, context: Dict[str, Any] = None) -> None:
         """
@@ -331,10 +321,6 @@ def log_error(message: str, **kwargs) -> None:
     logger = get_logger()
     logger.error(message, **kwargs)
 
-# 默认日志配置
-if _global_logger is None:
-    _global_logger = LogUtils(logger_name="bill_cleaner")
-
 def main():
     """
     主函数，用于测试日志工具